@@ -1,13 +1,48 @@
 import json
 from pathlib import Path
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
+from typing import List, Optional
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import os
 from ..utils.logger import logger
 
+def cpu_supports_aes() -> Optional[bool]:
+    """Check the CPU flags for AES-NI, returns None when they can't be read"""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return 'aes' in line.split(':', 1)[1].split()
+    except OSError:
+        pass
+    return None
+
+def _check_aes_acceleration():
+    """Log the OpenSSL build and whether AES-NI is available to it"""
+    try:
+        from cryptography.hazmat.backends.openssl.backend import backend
+        logger.info(f"Encryption backend: {backend.openssl_version_text()}")
+    except Exception as e:
+        logger.debug(f"Could not determine OpenSSL version: {e}")
+    
+    if os.getenv('OPENSSL_ia32cap'):
+        logger.info(f"OPENSSL_ia32cap override in effect: {os.getenv('OPENSSL_ia32cap')}")
+    
+    aes_supported = cpu_supports_aes()
+    if aes_supported is None:
+        logger.debug("Could not read CPU flags, AES-NI status unknown")
+    elif aes_supported:
+        logger.info("AES-NI available, hardware accelerated encryption enabled")
+    else:
+        logger.warning("CPU does not report AES-NI, encryption will use software AES and be slower")
+    return aes_supported
+
 class DatabaseEncryptor:
+    aes_acceleration: Optional[bool] = None
+    _acceleration_checked = False
+    
     def __init__(self, key_path: Path = Path('.encryption_key')):
         self.key_path = key_path
         self.cipher = None
@@ -15,6 +50,10 @@ class DatabaseEncryptor:
     
     def _initialize_encryption(self):
         """Initialize encryption with stored or new key"""
+        if not DatabaseEncryptor._acceleration_checked:
+            DatabaseEncryptor.aes_acceleration = _check_aes_acceleration()
+            DatabaseEncryptor._acceleration_checked = True
+        
         if not self.key_path.exists():
             self._generate_new_key()
         else:
@@ -58,16 +97,39 @@ class DatabaseEncryptor:
             logger.error(f"Failed to decrypt data: {e}")
             raise
     
+    def encrypt_batch(self, rows: List[dict]) -> bytes:
+        """Encrypt a list of records as a single token"""
+        if not self.cipher:
+            raise RuntimeError("Encryptor not initialized")
+        
+        json_data = json.dumps(rows, default=str).encode()
+        return self.cipher.encrypt(json_data)
+    
+    def decrypt_batch(self, encrypted_data: bytes) -> List[dict]:
+        """Decrypt a token produced by encrypt_batch"""
+        return self.decrypt_data(encrypted_data)
+    
     def encrypt_field(self, value: str) -> str:
         """Encrypt individual field"""
-        encrypted = self.encrypt_data({'value': value})
-        return base64.urlsafe_b64encode(encrypted).decode()
+        # Fernet tokens are already urlsafe base64, no need to encode again
+        return self.encrypt_data({'value': value}).decode('ascii')
     
     def decrypt_field(self, encrypted_value: str) -> str:
         """Decrypt individual field"""
-        encrypted = base64.urlsafe_b64decode(encrypted_value.encode())
-        data = self.decrypt_data(encrypted)
-        return data['value']
+        if not self.cipher:
+            raise RuntimeError("Encryptor not initialized")
+        
+        token = encrypted_value.encode('ascii')
+        try:
+            json_data = self.cipher.decrypt(token)
+        except InvalidToken:
+            # Values written before the single-encoding format were base64 wrapped twice
+            try:
+                json_data = self.cipher.decrypt(base64.urlsafe_b64decode(token))
+            except Exception as e:
+                logger.error(f"Failed to decrypt field: {e}")
+                raise
+        return json.loads(json_data.decode())['value']
 
 # Global encryptor instance
 encryptor = DatabaseEncryptor()
\ No newline at end of file
@@ -1,87 +1,243 @@
-from sqlalchemy import desc, func, and_
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import desc, func, and_, select, bindparam, update, exists, case
+from sqlalchemy.exc import OperationalError
 from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from tenacity import Retrying, stop_after_attempt, wait_exponential, retry_if_exception_type
 import time
 from .models import DatabaseManager, Trip, CanceledTrip, ScrapingSession, DatabaseMetrics
 from ..utils.logger import logger
 from ..utils.monitoring import track_execution_time
 
+# Keep IN (...) lookups below SQLite's SQLITE_MAX_VARIABLE_NUMBER
+BULK_CHUNK_SIZE = 500
+
+# Shared retry policy for database calls, built once instead of per decorated call.
+# Only transient errors such as "database is locked" are retried; integrity and
+# data errors fail the same way on every attempt.
+DB_RETRY = Retrying(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type(OperationalError),
+    reraise=True
+)
+
+# Upper bound on trip IDs remembered by the trip_exists cache
+TRIP_CACHE_SIZE = 4096
+
+# Statements built once at import so the compiled SQL is reused from the engine cache
+_TRIP_EXISTS_STMT = select(exists().where(Trip.trip_id == bindparam('tid')))
+
+_LAST_TRIP_STMT = select(Trip.date).order_by(desc(Trip.date)).limit(1)
+
+_EARNINGS_SUMMARY_STMT = select(
+    func.count(),  # count(*) keeps the query inside ix_trip_date_canc_earn
+    func.sum(Trip.earnings),
+    func.avg(Trip.earnings)
+).where(
+    and_(
+        Trip.date >= bindparam('start_date'),
+        Trip.date <= bindparam('end_date'),
+        Trip.is_canceled == False
+    )
+)
+
 class DataOperations:
     def __init__(self):
         self.db_manager = DatabaseManager()
+        self._exists_cache: OrderedDict[str, bool] = OrderedDict()
+        self._session = None
+        # Bumped on every successful write so cached reads know when they are stale
+        self._write_epoch = 0
+        self._last_date_cache: Optional[Tuple[int, Optional[datetime]]] = None
+        self._earnings_summary_cache = lru_cache(maxsize=32)(self._query_earnings_summary)
+    
+    def __enter__(self):
+        """Run every call made inside the with block in one session and transaction"""
+        self._session = self.db_manager.Session()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self._session.commit()
+            else:
+                self._session.rollback()
+                # Cached reads may reflect writes that were just rolled back
+                self.clear_trip_cache()
+                self._write_epoch += 1
+        finally:
+            self._session.close()
+            self._session = None
+    
+    @contextmanager
+    def _session_scope(self):
+        """Yield the shared session when inside a with block, otherwise a fresh one"""
+        if self._session is None:
+            with self.db_manager.get_session() as session:
+                yield session
+            return
+        
+        # A savepoint keeps a failed call from poisoning the shared transaction
+        with self._session.begin_nested():
+            yield self._session
+    
+    def _commit(self, session):
+        """Commit a per-call session, the shared session is committed by __exit__"""
+        if session is self._session:
+            session.flush()
+        else:
+            session.commit()
+    
+    def _cache_trip_exists(self, trip_id: str, found: bool):
+        """Remember trip existence, evicting the least recently used entry on overflow"""
+        self._exists_cache[trip_id] = found
+        self._exists_cache.move_to_end(trip_id)
+        if len(self._exists_cache) > TRIP_CACHE_SIZE:
+            self._exists_cache.popitem(last=False)
+    
+    def clear_trip_cache(self):
+        """Drop all cached trip existence lookups"""
+        self._exists_cache.clear()
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(SQLAlchemyError)
-    )
     @track_execution_time
     def trip_exists(self, trip_id: str) -> bool:
         """Check if a trip already exists in database"""
-        with self.db_manager.get_session() as session:
-            return session.query(Trip).filter(Trip.trip_id == trip_id).first() is not None
+        cached = self._exists_cache.get(trip_id)
+        if cached is not None:
+            self._exists_cache.move_to_end(trip_id)
+            return cached
+        
+        found = DB_RETRY(self._query_trip_exists, trip_id)
+        self._cache_trip_exists(trip_id, found)
+        return found
+    
+    def _query_trip_exists(self, trip_id: str) -> bool:
+        """Look up a trip ID in the database, bypassing the cache"""
+        with self._session_scope() as session:
+            return bool(session.execute(_TRIP_EXISTS_STMT, {'tid': trip_id}).scalar())
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(SQLAlchemyError)
-    )
     @track_execution_time
     def save_trip(self, trip_data: dict) -> bool:
         """Save trip data to database"""
+        return self.save_trips_bulk([trip_data]) == 1
+    
+    @track_execution_time
+    def save_trips_bulk(self, trip_list: List[dict]) -> int:
+        """Save a batch of trips in a single transaction, returns number of trips written"""
+        if not trip_list:
+            return 0
+        
         try:
-            with self.db_manager.get_session() as session:
-                # Check if trip already exists
-                existing = session.query(Trip).filter(Trip.trip_id == trip_data['trip_id']).first()
-                
-                if existing:
-                    # Update existing record
-                    for key, value in trip_data.items():
-                        setattr(existing, key, value)
-                    existing.updated_at = datetime.utcnow()
-                else:
-                    # Create new record
-                    trip = Trip(**trip_data)
-                    session.add(trip)
+            return DB_RETRY(self._write_trips, trip_list)
+        except Exception as e:
+            logger.error(f"Failed to save trip batch of {len(trip_list)}: {e}")
+            return 0
+    
+    def _write_trips(self, trip_list: List[dict]) -> int:
+        """Insert or update trips in one transaction, raising on database errors"""
+        with self._session_scope() as session:
+            inserts, updates = [], []
+            pending = set()
+            now = datetime.utcnow()
+            
+            for start in range(0, len(trip_list), BULK_CHUNK_SIZE):
+                chunk = trip_list[start:start + BULK_CHUNK_SIZE]
+                chunk_ids = [trip['trip_id'] for trip in chunk]
                 
-                session.commit()
-                logger.info(f"Saved trip {trip_data['trip_id']}")
-                return True
+                # One lookup per chunk instead of one per trip
+                existing = {
+                    row.trip_id for row in
+                    session.query(Trip.trip_id).filter(Trip.trip_id.in_(chunk_ids))
+                }
                 
-        except Exception as e:
-            logger.error(f"Failed to save trip {trip_data.get('trip_id')}: {e}")
-            return False
+                for trip in chunk:
+                    if trip['trip_id'] in existing or trip['trip_id'] in pending:
+                        updates.append({**trip, 'updated_at': now})
+                    else:
+                        # Guard against duplicate IDs within the same batch
+                        pending.add(trip['trip_id'])
+                        inserts.append(trip)
+            
+            if inserts:
+                session.bulk_insert_mappings(Trip, inserts)
+            if updates:
+                session.bulk_update_mappings(Trip, updates)
+            
+            self._commit(session)
+            self._write_epoch += 1
+            for trip in trip_list:
+                self._cache_trip_exists(trip['trip_id'], True)
+            
+            if len(trip_list) == 1:
+                logger.info(f"Saved trip {trip_list[0]['trip_id']}")
+            else:
+                logger.info(f"Saved {len(trip_list)} trips ({len(inserts)} new, {len(updates)} updated)")
+            return len(trip_list)
     
     @track_execution_time
     def save_canceled_trip(self, canceled_data: dict) -> bool:
         """Save canceled trip data"""
+        return self.save_canceled_trips_bulk([canceled_data]) == 1
+    
+    @track_execution_time
+    def save_canceled_trips_bulk(self, canceled_list: List[dict]) -> int:
+        """Save a batch of canceled trips in a single transaction, returns number of trips written"""
+        if not canceled_list:
+            return 0
+        
         try:
-            with self.db_manager.get_session() as session:
-                canceled_trip = CanceledTrip(**canceled_data)
-                session.add(canceled_trip)
-                session.commit()
-                logger.info(f"Saved canceled trip {canceled_data['trip_id']}")
-                return True
+            with self._session_scope() as session:
+                inserts = []
+                seen = set()
+                
+                for start in range(0, len(canceled_list), BULK_CHUNK_SIZE):
+                    chunk = canceled_list[start:start + BULK_CHUNK_SIZE]
+                    chunk_ids = [trip['trip_id'] for trip in chunk]
+                    
+                    seen.update(
+                        row.trip_id for row in
+                        session.query(CanceledTrip.trip_id).filter(CanceledTrip.trip_id.in_(chunk_ids))
+                    )
+                    
+                    for trip in chunk:
+                        if trip['trip_id'] not in seen:
+                            seen.add(trip['trip_id'])
+                            inserts.append(trip)
+                
+                if inserts:
+                    session.bulk_insert_mappings(CanceledTrip, inserts)
+                
+                self._commit(session)
+                self._write_epoch += 1
+                logger.info(f"Saved {len(inserts)} canceled trips ({len(canceled_list) - len(inserts)} already stored)")
+                return len(inserts)
+                
         except Exception as e:
-            logger.error(f"Failed to save canceled trip {canceled_data.get('trip_id')}: {e}")
-            return False
+            logger.error(f"Failed to save canceled trip batch of {len(canceled_list)}: {e}")
+            return 0
     
     @track_execution_time
     def get_last_scraped_date(self) -> Optional[datetime]:
         """Get the date of the last scraped trip"""
-        with self.db_manager.get_session() as session:
-            last_trip = session.query(Trip).order_by(desc(Trip.date)).first()
-            return last_trip.date if last_trip else None
+        if self._last_date_cache and self._last_date_cache[0] == self._write_epoch:
+            return self._last_date_cache[1]
+        
+        with self._session_scope() as session:
+            last_date = session.execute(_LAST_TRIP_STMT).scalar()
+        
+        self._last_date_cache = (self._write_epoch, last_date)
+        return last_date
     
     @track_execution_time
     def start_scraping_session(self) -> int:
         """Start a new scraping session and return session ID"""
-        with self.db_manager.get_session() as session:
+        with self._session_scope() as session:
             scraping_session = ScrapingSession(status='started')
             session.add(scraping_session)
-            session.commit()
+            self._commit(session)
             logger.info(f"Started scraping session {scraping_session.id}")
             return scraping_session.id
     
@@ -90,32 +246,36 @@ class DataOperations:
                                 canceled_count: int, last_date: datetime,
                                 duration: float, error_message: str = None):
         """Mark scraping session as completed"""
-        with self.db_manager.get_session() as session:
-            scraping_session = session.query(ScrapingSession).get(session_id)
-            if scraping_session:
-                scraping_session.status = 'completed' if not error_message else 'failed'
-                scraping_session.trips_scraped = trips_count
-                scraping_session.canceled_trips_scraped = canceled_count
-                scraping_session.last_trip_date = last_date
-                scraping_session.duration_seconds = duration
-                scraping_session.error_message = error_message
-                session.commit()
+        with self._session_scope() as session:
+            result = session.execute(
+                update(ScrapingSession)
+                .where(ScrapingSession.id == session_id)
+                .values(
+                    status='completed' if not error_message else 'failed',
+                    trips_scraped=trips_count,
+                    canceled_trips_scraped=canceled_count,
+                    last_trip_date=last_date,
+                    duration_seconds=duration,
+                    error_message=error_message
+                )
+            )
+            self._commit(session)
+            if result.rowcount:
                 logger.info(f"Completed scraping session {session_id}")
+        
+        self.clear_trip_cache()
     
     @track_execution_time
     def get_earnings_summary(self, start_date: datetime, end_date: datetime) -> dict:
         """Get earnings summary for date range"""
-        with self.db_manager.get_session() as session:
-            result = session.query(
-                func.count(Trip.trip_id),
-                func.sum(Trip.earnings),
-                func.avg(Trip.earnings)
-            ).filter(
-                and_(
-                    Trip.date >= start_date,
-                    Trip.date <= end_date,
-                    Trip.is_canceled == False
-                )
+        return dict(self._earnings_summary_cache(start_date, end_date, self._write_epoch))
+    
+    def _query_earnings_summary(self, start_date: datetime, end_date: datetime, write_epoch: int) -> dict:
+        """Run the earnings aggregate, write_epoch only keys the cache"""
+        with self._session_scope() as session:
+            result = session.execute(
+                _EARNINGS_SUMMARY_STMT,
+                {'start_date': start_date, 'end_date': end_date}
             ).first()
             
             return {
@@ -127,21 +287,22 @@ class DataOperations:
     @track_execution_time
     def update_database_metrics(self):
         """Update database metrics table"""
-        with self.db_manager.get_session() as session:
-            # Calculate metrics
-            total_trips = session.query(func.count(Trip.trip_id)).scalar()
-            earnings_data = session.query(
-                func.sum(Trip.earnings),
-                func.avg(Trip.earnings)
-            ).filter(Trip.is_canceled == False).first()
+        with self._session_scope() as session:
+            # Calculate metrics in one pass, earnings only count completed trips
+            completed_earnings = case((Trip.is_canceled == False, Trip.earnings))
+            total_trips, total_earnings, avg_earnings = session.query(
+                func.count(Trip.trip_id),
+                func.sum(completed_earnings),
+                func.avg(completed_earnings)
+            ).first()
             
             metrics = DatabaseMetrics(
                 metric_date=datetime.utcnow(),
                 total_trips=total_trips,
-                total_earnings=earnings_data[0] or 0.0,
-                avg_earnings_per_trip=earnings_data[1] or 0.0,
+                total_earnings=total_earnings or 0.0,
+                avg_earnings_per_trip=avg_earnings or 0.0,
                 success_rate=1.0  # Placeholder for actual success rate calculation
             )
             
             session.add(metrics)
-            session.commit()
\ No newline at end of file
+            self._commit(session)
\ No newline at end of file
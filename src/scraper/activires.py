@@ -1,33 +1,87 @@
-from playwright.sync_api import Page
+from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
 from datetime import datetime
+import logging
 import time
-from typing import List, Dict, Optional
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from typing import List, Dict, Optional, Tuple
+from tenacity import Retrying, stop_after_attempt, wait_exponential, retry_if_exception_type
+from ..utils.config import config
 from ..utils.logger import logger
 from ..utils.date_utils import get_uber_week_range, is_current_week
 from ..utils.monitoring import track_execution_time
 from ..database.operations import DataOperations
 from .exceptions import UberScrapingError, UberLoginRequired, UberRateLimit
 
+# Retry policy for date picker interactions
+SCRAPE_RETRY = Retrying(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception_type((UberScrapingError, TimeoutError)),
+    reraise=True
+)
+
+TRIP_CARD_SELECTOR = '[data-testid="trip-card"], [class*="trip-card"]'
+
+# Resolves once the page holds more trip cards than the given count
+MORE_TRIP_CARDS_JS = "([selector, count]) => document.querySelectorAll(selector).length > count"
+
+# Resolves once the calendar month label no longer shows the given text
+MONTH_CHANGED_JS = "([label, text]) => label.innerText !== text"
+
+# Resolves once the element matching selector no longer shows the given text
+TEXT_CHANGED_JS = """
+([selector, text]) => {
+    const el = document.querySelector(selector);
+    return el !== null && el.innerText !== text;
+}
+"""
+
+# Collects the fields _parse_trip_card needs for every card from start index onwards
+EXTRACT_TRIP_CARDS_JS = """
+([selector, startIndex, includeRaw]) => {
+    const cards = Array.from(document.querySelectorAll(selector));
+    const text = (el) => el ? el.innerText : '';
+    return {
+        count: cards.length,
+        cards: cards.slice(startIndex).map((card) => {
+            const date = card.querySelector('[data-testid="trip-date"], [class*="trip-date"]');
+            const earnings = card.querySelector('[data-testid="trip-earnings"], [class*="trip-earnings"]');
+            const details = Array.from(card.querySelectorAll('button, [data-testid="view-details"]')).find(
+                (el) => el.matches('[data-testid="view-details"]') ||
+                    el.innerText.trim().toLowerCase().includes('view details')
+            );
+            return {
+                trip_id: card.getAttribute('data-trip-id') || card.getAttribute('data-id') || card.getAttribute('id'),
+                date: text(date),
+                earnings: text(earnings),
+                details_id: details ? details.getAttribute('id') : null,
+                details_class: details ? details.getAttribute('class') : null,
+                raw: includeRaw ? card.innerText.slice(0, 200) : ''
+            };
+        })
+    };
+}
+"""
+
 class ActivitiesScraper:
     def __init__(self, page: Page):
         self.page = page
         self.data_ops = DataOperations()
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((UberScrapingError, TimeoutError))
-    )
     @track_execution_time
     def select_week(self, target_date: datetime) -> bool:
         """Select specific week in date picker"""
+        return SCRAPE_RETRY(self._select_week, target_date)
+    
+    def _select_week(self, target_date: datetime) -> bool:
+        """Single attempt at selecting the week, raises UberScrapingError on failure"""
         try:
             # Open date picker
             date_selector = '[data-testid="date-picker"]'
             if not self.page.wait_for_selector(date_selector, timeout=10000):
                 raise UberScrapingError("Date picker not found")
             
+            # Remember the shown date range so we can tell when the new week is applied
+            range_text = self.page.inner_text(date_selector)
             self.page.click(date_selector)
             
             # Wait for calendar to open
@@ -42,7 +96,13 @@ class ActivitiesScraper:
             if date_cell:
                 date_cell.click()
                 logger.info(f"Selected week containing {target_date.strftime('%Y-%m-%d')}")
-                time.sleep(2)  # Wait for page to load
+                try:
+                    self.page.wait_for_function(
+                        TEXT_CHANGED_JS, arg=[date_selector, range_text], timeout=5000
+                    )
+                except PlaywrightTimeoutError:
+                    # Same week was already selected, or the label is not updated by the page
+                    logger.debug("Date range label did not change after selecting week")
                 return True
             
             logger.error(f"Could not find date {target_date.strftime('%Y-%m-%d')} in picker")
@@ -78,7 +138,12 @@ class ActivitiesScraper:
                 
                 if nav_btn:
                     nav_btn.click()
-                    time.sleep(1)
+                    try:
+                        self.page.wait_for_function(
+                            MONTH_CHANGED_JS, arg=[current_month, current_text], timeout=5000
+                        )
+                    except PlaywrightTimeoutError:
+                        logger.debug("Calendar month label did not change after navigation")
                     current_text = current_month.inner_text()
                 else:
                     break
@@ -93,18 +158,24 @@ class ActivitiesScraper:
     def load_all_trips(self) -> List[Dict]:
         """Load all trips by clicking 'Load More' until it disappears"""
         trips = []
+        parsed_count = 0  # Cards already parsed on previous iterations
         max_attempts = 50  # Safety limit
         consecutive_failures = 0
         
         for attempt in range(max_attempts):
             try:
-                # Extract current trips before loading more
-                current_trips = self._extract_trips_from_page()
-                if len(current_trips) == len(trips) and attempt > 0:
+                # Only parse cards appended since the last "Load More"
+                new_trips, card_count = self._extract_trips_from_page(parsed_count)
+                if card_count < parsed_count:
+                    # List was re-rendered with fewer cards, parse it again from the top
+                    logger.warning(f"Trip list shrank from {parsed_count} to {card_count} cards, re-extracting")
+                    trips, parsed_count = self._extract_trips_from_page(0)
+                elif card_count == parsed_count and attempt > 0:
                     consecutive_failures += 1
                 else:
                     consecutive_failures = 0
-                    trips = current_trips
+                    trips.extend(new_trips)
+                    parsed_count = card_count
                 
                 # Check for load more button
                 load_more_btn = self.page.query_selector('button:has-text("Load More")')
@@ -114,7 +185,7 @@ class ActivitiesScraper:
                     break
                 
                 # Click load more with retry
-                if self._safe_click_load_more(load_more_btn):
+                if self._safe_click_load_more(load_more_btn, parsed_count):
                     logger.info(f"Loaded more trips, total: {len(trips)}")
                 else:
                     consecutive_failures += 1
@@ -132,18 +203,19 @@ class ActivitiesScraper:
         return trips
     
     @track_execution_time
-    def _safe_click_load_more(self, button) -> bool:
+    def _safe_click_load_more(self, button, card_count: int) -> bool:
         """Safely click load more button with error handling"""
         try:
-            # Scroll to button
-            self.page.evaluate("(element) => element.scrollIntoView({behavior: 'smooth', block: 'center'})", button)
-            time.sleep(0.5)
-            
-            # Click button
+            # Click scrolls the button into view itself
             button.click()
             
-            # Wait for loading to complete
-            self.page.wait_for_timeout(3000)
+            # Wait for new cards to render instead of a fixed delay
+            try:
+                self.page.wait_for_function(
+                    MORE_TRIP_CARDS_JS, arg=[TRIP_CARD_SELECTOR, card_count], timeout=15000
+                )
+            except PlaywrightTimeoutError:
+                logger.debug("No new trip cards appeared after Load More")
             
             return True
         except Exception as e:
@@ -151,17 +223,23 @@ class ActivitiesScraper:
             return False
     
     @track_execution_time
-    def _extract_trips_from_page(self) -> List[Dict]:
-        """Extract trip summaries from activities page"""
+    def _extract_trips_from_page(self, start_index: int = 0) -> Tuple[List[Dict], int]:
+        """Extract trip summaries for cards from start_index onwards, returns trips and total card count"""
         trips = []
+        card_count = start_index
         
         try:
-            # More specific selector for trip cards
-            trip_cards = self.page.query_selector_all('[data-testid="trip-card"], [class*="trip-card"]')
+            # Walk the cards in one evaluate call instead of several round-trips per card
+            # Raw card text is only kept for debugging
+            include_raw = logger.logger.isEnabledFor(logging.DEBUG)
+            result = self.page.evaluate(
+                EXTRACT_TRIP_CARDS_JS, [TRIP_CARD_SELECTOR, start_index, include_raw]
+            )
+            card_count = result['count']
             
-            for card in trip_cards:
+            for card_data in result['cards']:
                 try:
-                    trip_data = self._parse_trip_card(card)
+                    trip_data = self._parse_trip_card(card_data)
                     if trip_data and trip_data.get('trip_id'):
                         trips.append(trip_data)
                 except Exception as e:
@@ -171,51 +249,33 @@ class ActivitiesScraper:
         except Exception as e:
             logger.error(f"Error extracting trips: {e}")
         
-        return trips
+        return trips, card_count
     
-    @track_execution_time
-    def _parse_trip_card(self, card) -> Optional[Dict]:
-        """Parse individual trip card data"""
-        try:
-            # Try multiple possible selectors for trip ID
-            trip_id = (
-                card.get_attribute('data-trip-id') or
-                card.get_attribute('data-id') or
-                card.get_attribute('id')
-            )
-            
-            if not trip_id:
-                return None
-            
-            # Extract other details
-            date_element = card.query_selector('[data-testid="trip-date"], [class*="trip-date"]')
-            earnings_element = card.query_selector('[data-testid="trip-earnings"], [class*="trip-earnings"]')
-            details_button = card.query_selector('button:has-text("View Details"), [data-testid="view-details"]')
-            
-            return {
-                'trip_id': trip_id,
-                'date': self._parse_date(date_element.inner_text() if date_element else ''),
-                'earnings': self._parse_currency(earnings_element.inner_text() if earnings_element else ''),
-                'view_details_selector': self._get_view_details_selector(details_button, trip_id),
-                'raw_card_data': card.inner_text()[:200]  # Store partial raw data for debugging
-            }
-            
-        except Exception as e:
-            logger.warning(f"Failed to parse trip card: {e}")
+    def _parse_trip_card(self, card_data: Dict) -> Optional[Dict]:
+        """Parse trip card data returned by EXTRACT_TRIP_CARDS_JS"""
+        trip_id = card_data.get('trip_id')
+        if not trip_id:
             return None
+        
+        return {
+            'trip_id': trip_id,
+            'date': self._parse_date(card_data.get('date') or ''),
+            'earnings': self._parse_currency(card_data.get('earnings') or ''),
+            'view_details_selector': self._get_view_details_selector(
+                card_data.get('details_id'), card_data.get('details_class'), trip_id
+            ),
+            'raw_card_data': card_data.get('raw', '')  # Store partial raw data for debugging
+        }
     
-    @track_execution_time
-    def _get_view_details_selector(self, button, trip_id: str) -> str:
+    def _get_view_details_selector(self, button_id: Optional[str], button_class: Optional[str],
+                                   trip_id: str) -> str:
         """Generate selector for view details button"""
-        if button:
-            # Try to get a reliable selector
-            button_id = button.get_attribute('id')
-            if button_id:
-                return f'#{button_id}'
-            
-            button_class = button.get_attribute('class')
-            if button_class:
-                return f'[class="{button_class}"]'
+        # Try to get a reliable selector
+        if button_id:
+            return f'#{button_id}'
+        
+        if button_class:
+            return f'[class="{button_class}"]'
         
         # Fallback selector
-        return f'[data-trip-id="{trip_id}"] button'
\ No newline at end of file
+        return f'[data-trip-id="{trip_id}"] button'
@@ -3,24 +3,29 @@ import yaml
 from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, field_validator
 from ..utils.validators import validate_file_path, validate_positive_int
 
 load_dotenv()
 
+# libyaml's C loader when available, pure-Python otherwise
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 class BrowserConfig(BaseModel):
     headless: bool = False
     slow_mo: int = 100
     timeout: int = 30000
     user_data_dir: Path = Path("./browser_data")
     
-    @validator('headless', pre=True)
+    @field_validator('headless', mode='before')
+    @classmethod
     def parse_headless(cls, v):
         if isinstance(v, str):
             return v.lower() == 'true'
         return bool(v)
     
-    @validator('slow_mo')
+    @field_validator('slow_mo')
+    @classmethod
     def validate_slow_mo(cls, v):
         return validate_positive_int(v, 0, 1000)
 
@@ -29,7 +34,8 @@ class DatabaseConfig(BaseModel):
     backup_path: Path = Path("./backups")
     encrypt_database: bool = True
     
-    @validator('path', 'backup_path', pre=True)
+    @field_validator('path', 'backup_path', mode='before')
+    @classmethod
     def validate_paths(cls, v):
         return validate_file_path(v)
 
@@ -40,7 +46,8 @@ class ScrapingConfig(BaseModel):
     wait_timeout: int = 30
     request_delay: float = 1.0
     
-    @validator('base_url')
+    @field_validator('base_url')
+    @classmethod
     def validate_url(cls, v):
         if not v.startswith(('http://', 'https://')):
             raise ValueError('URL must start with http:// or https://')
@@ -87,8 +94,9 @@ class Config(BaseModel):
         # Override with YAML file if exists
         if config_path and config_path.exists():
             with open(config_path, 'r') as f:
-                file_config = yaml.safe_load(f)
-                config_data = cls._deep_merge(config_data, file_config)
+                file_config = yaml.load(f, Loader=YAML_LOADER)
+                if file_config:
+                    config_data = cls._deep_merge(config_data, file_config)
         
         return cls(**config_data)
     
@@ -1,17 +1,20 @@
 import logging
+import re
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
-import json
-from typing import Any, Dict
-from .config import config
+import orjson
+from typing import Any, Dict, Optional
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging"""
     
     def format(self, record: logging.LogRecord) -> str:
+        # Build the UTC timestamp from record.created instead of a fresh datetime per record
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': f"{timestamp}.{int(record.msecs):03d}Z",
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -23,18 +26,27 @@ class JSONFormatter(logging.Formatter):
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
         
-        return json.dumps(log_entry)
+        return orjson.dumps(log_entry).decode()
 
 class SensitiveDataFilter(logging.Filter):
     """Filter to prevent logging sensitive data"""
     
+    _PATTERN = re.compile(r'password|token|secret|key|earnings|fare', re.IGNORECASE)
+    
+    def __init__(self, enabled: Optional[bool] = None):
+        super().__init__()
+        # None defers reading config until the first record is filtered
+        self._enabled = enabled
+    
     def filter(self, record: logging.LogRecord) -> bool:
-        if not config.security.log_sensitive_data:
-            sensitive_terms = ['password', 'token', 'secret', 'key', 'earnings', 'fare']
-            message = record.getMessage().lower()
-            if any(term in message for term in sensitive_terms):
-                return False
-        return True
+        if self._enabled is None:
+            from .config import config
+            self._enabled = config.security.log_sensitive_data
+        if self._enabled:
+            return True
+        # Skip %-formatting when the message has no arguments
+        message = record.getMessage() if record.args else str(record.msg)
+        return not self._PATTERN.search(message)
 
 class Logger:
     def __init__(self):
@@ -43,6 +55,10 @@ class Logger:
     
     def _setup_logger(self):
         """Configure logger with file and console handlers"""
+        if self.logger.handlers:
+            # Already configured by an earlier Logger instance
+            return
+        
         self.logger.setLevel(logging.INFO)
         
         # Create logs directory
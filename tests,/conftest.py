@@ -0,0 +1,57 @@
+import importlib
+import importlib.machinery
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_config(tmp_path_factory):
+    """Stand-in for src.utils.config so tests don't load YAML, .env or the validators module"""
+    config = types.SimpleNamespace(
+        security=types.SimpleNamespace(log_sensitive_data=False, backup_retention_days=7),
+        database=types.SimpleNamespace(
+            path=tmp_path_factory.mktemp('db') / 'uber_earnings.db',
+            backup_path=tmp_path_factory.mktemp('backups'),
+            encrypt_database=False
+        ),
+        scraping=types.SimpleNamespace(request_delay=0)
+    )
+    config_module = types.ModuleType('src.utils.config')
+    config_module.config = config
+    
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setitem(sys.modules, 'src.utils.config', config_module)
+        # Importing the app creates logs/ and .encryption_key in the cwd
+        mp.chdir(tmp_path_factory.mktemp('workdir'))
+        yield config
+
+
+@pytest.fixture(scope='session')
+def operations(app_config):
+    """Import src.database.operations with the pieces missing from this tree filled in"""
+    monitoring = types.ModuleType('src.utils.monitoring')
+    monitoring.track_execution_time = lambda func: func
+    
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setitem(sys.modules, 'src.utils.monitoring', monitoring)
+        
+        # The models module lives in a file named "models py"
+        models_path = Path(__file__).resolve().parent.parent / 'src' / 'database' / 'models py'
+        loader = importlib.machinery.SourceFileLoader('src.database.models', str(models_path))
+        spec = importlib.util.spec_from_loader('src.database.models', loader)
+        models = importlib.util.module_from_spec(spec)
+        mp.setitem(sys.modules, 'src.database.models', models)
+        spec.loader.exec_module(models)
+        
+        yield importlib.import_module('src.database.operations')
+
+
+@pytest.fixture
+def data_ops(operations, app_config, tmp_path, monkeypatch):
+    """DataOperations backed by a fresh SQLite file"""
+    monkeypatch.setattr(app_config.database, 'path', tmp_path / 'trips.db')
+    return operations.DataOperations()
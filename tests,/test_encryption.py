@@ -0,0 +1,44 @@
+import base64
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def encryptor(app_config, tmp_path):
+    encryption = importlib.import_module('src.database.encryption')
+    return encryption.DatabaseEncryptor(key_path=tmp_path / 'test_key')
+
+
+def test_field_round_trip(encryptor):
+    encrypted = encryptor.encrypt_field('Westlands, Nairobi')
+    
+    assert encrypted != 'Westlands, Nairobi'
+    assert encryptor.decrypt_field(encrypted) == 'Westlands, Nairobi'
+
+
+def test_field_is_single_encoded_token(encryptor):
+    encrypted = encryptor.encrypt_field('Kilimani')
+    
+    # Fernet tokens start with the version byte 0x80, which base64 encodes to 'gAAAAA'
+    assert encrypted.startswith('gAAAAA')
+
+
+def test_decrypt_legacy_double_encoded_field(encryptor):
+    legacy = base64.urlsafe_b64encode(encryptor.encrypt_data({'value': 'Karen'})).decode()
+    
+    assert encryptor.decrypt_field(legacy) == 'Karen'
+
+
+def test_decrypt_field_rejects_garbage(encryptor):
+    with pytest.raises(Exception):
+        encryptor.decrypt_field('bm90IGEgdG9rZW4=')
+
+
+def test_batch_round_trip(encryptor):
+    rows = [
+        {'trip_id': 'a1', 'earnings': 350.0},
+        {'trip_id': 'b2', 'earnings': 410.5},
+    ]
+    
+    assert encryptor.decrypt_batch(encryptor.encrypt_batch(rows)) == rows
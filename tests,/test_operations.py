@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete
+
+
+def make_trip(trip_id, earnings=100.0, date=datetime(2024, 5, 6, 8, 30)):
+    return {'trip_id': trip_id, 'date': date, 'earnings': earnings, 'is_canceled': False}
+
+
+def stored_trips(data_ops, operations):
+    with data_ops.db_manager.get_session() as session:
+        return {trip.trip_id: trip for trip in session.query(operations.Trip)}
+
+
+def test_save_trip_returns_bool(data_ops, operations):
+    assert data_ops.save_trip(make_trip('t1')) is True
+    assert set(stored_trips(data_ops, operations)) == {'t1'}
+
+
+def test_save_trips_bulk_splits_inserts_and_updates(data_ops, operations):
+    data_ops.save_trips_bulk([make_trip('t1', 100.0), make_trip('t2', 200.0)])
+    
+    written = data_ops.save_trips_bulk([make_trip('t2', 250.0), make_trip('t3', 300.0)])
+    
+    trips = stored_trips(data_ops, operations)
+    assert written == 2
+    assert {trip_id: trip.earnings for trip_id, trip in trips.items()} == {
+        't1': 100.0, 't2': 250.0, 't3': 300.0
+    }
+
+
+def test_save_trips_bulk_handles_duplicate_ids_in_batch(data_ops, operations):
+    written = data_ops.save_trips_bulk([make_trip('t1', 100.0), make_trip('t1', 150.0)])
+    
+    trips = stored_trips(data_ops, operations)
+    assert written == 2
+    assert list(trips) == ['t1']
+    assert trips['t1'].earnings == 150.0
+
+
+def test_save_trips_bulk_spans_multiple_chunks(data_ops, operations):
+    count = operations.BULK_CHUNK_SIZE * 2 + 1
+    data_ops.save_trips_bulk([make_trip(f't{i}') for i in range(count)])
+    
+    # Second pass is all updates, including a duplicate split across chunks
+    batch = [make_trip(f't{i}', 1.0) for i in range(count)] + [make_trip('t0', 2.0)]
+    written = data_ops.save_trips_bulk(batch)
+    
+    trips = stored_trips(data_ops, operations)
+    assert written == count + 1
+    assert len(trips) == count
+    assert trips['t0'].earnings == 2.0
+    assert trips[f't{count - 1}'].earnings == 1.0
+
+
+def test_trip_exists_is_cached(data_ops, operations):
+    data_ops.save_trip(make_trip('t1'))
+    
+    # Remove the row behind the cache's back
+    with data_ops.db_manager.get_session() as session:
+        session.execute(delete(operations.Trip))
+        session.commit()
+    
+    assert data_ops.trip_exists('t1') is True
+    data_ops.clear_trip_cache()
+    assert data_ops.trip_exists('t1') is False
+
+
+def test_trip_exists_caches_misses_until_saved(data_ops):
+    assert data_ops.trip_exists('t1') is False
+    
+    data_ops.save_trip(make_trip('t1'))
+    
+    assert data_ops.trip_exists('t1') is True
+
+
+def test_last_scraped_date_refreshes_after_write(data_ops):
+    data_ops.save_trip(make_trip('t1', date=datetime(2024, 5, 6)))
+    assert data_ops.get_last_scraped_date() == datetime(2024, 5, 6)
+    
+    data_ops.save_trip(make_trip('t2', date=datetime(2024, 5, 9)))
+    
+    assert data_ops.get_last_scraped_date() == datetime(2024, 5, 9)
+
+
+def test_earnings_summary_refreshes_after_write(data_ops):
+    start, end = datetime(2024, 5, 1), datetime(2024, 5, 31)
+    data_ops.save_trip(make_trip('t1', 100.0))
+    assert data_ops.get_earnings_summary(start, end)['total_earnings'] == 100.0
+    
+    data_ops.save_trip(make_trip('t2', 300.0))
+    
+    assert data_ops.get_earnings_summary(start, end) == {
+        'total_trips': 2,
+        'total_earnings': 400.0,
+        'average_earnings': 200.0
+    }
+
+
+def test_save_canceled_trips_bulk_skips_stored_ids(data_ops):
+    canceled = {'trip_id': 'c1', 'date': datetime(2024, 5, 6), 'trip_type': 'UberX'}
+    assert data_ops.save_canceled_trip(canceled) is True
+    
+    written = data_ops.save_canceled_trips_bulk([
+        canceled,
+        {'trip_id': 'c2', 'date': datetime(2024, 5, 7), 'trip_type': 'UberX'},
+        {'trip_id': 'c2', 'date': datetime(2024, 5, 7), 'trip_type': 'UberX'},
+    ])
+    
+    assert written == 1
+    assert data_ops.save_canceled_trip(canceled) is False
+
+
+def test_shared_session_rolls_back_on_error(data_ops, operations):
+    with pytest.raises(RuntimeError):
+        with data_ops as ops:
+            ops.save_trip(make_trip('t1'))
+            raise RuntimeError('scrape failed')
+    
+    assert stored_trips(data_ops, operations) == {}
+    assert data_ops.trip_exists('t1') is False
+
+
+def test_shared_session_commits_on_exit(data_ops, operations):
+    with data_ops as ops:
+        ops.save_trip(make_trip('t1'))
+        ops.save_trip(make_trip('t2'))
+    
+    assert set(stored_trips(data_ops, operations)) == {'t1', 't2'}
+
+
+def test_earnings_summary_uses_covering_index(data_ops, operations):
+    with data_ops.db_manager.engine.connect() as connection:
+        compiled = operations._EARNINGS_SUMMARY_STMT.compile(connection)
+        params = compiled.construct_params(
+            {'start_date': '2024-05-01', 'end_date': '2024-05-31'}
+        )
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}",
+            tuple(params[name] for name in compiled.positiontup)
+        ).fetchall()
+    
+    assert any('COVERING INDEX ix_trip_date_canc_earn' in row[-1] for row in plan)